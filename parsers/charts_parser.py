@@ -4,33 +4,54 @@ import re
 import random
 import pandas as pd
 
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
 
 
-async def parse_steamdb_charts(page):
-    data = []
+# Извлекаем всю таблицу в браузере за один вызов
+CHARTS_EXTRACTOR_JS = """
+() => Array.from(document.querySelectorAll("table.table-products tbody tr")).map(r => {
+    const c = r.children;
+
+    return {
+        app_id: r.dataset.appid,
+        rank: c[0].innerText,
+        name: c[2].innerText,
+        current_players: c[3].innerText,
+        "24h_peak": c[4].innerText,
+        all_time_peak: c[5].innerText,
+    };
+})
+"""
+
+
+
+ROWS_COUNT_JS = "() => document.querySelectorAll('table.table-products tbody tr').length"
 
+
+
+async def parse_steamdb_charts(page):
     await page.goto("https://steamdb.info/charts/", timeout=60000)
     await page.wait_for_selector("table.table-products")
 
     await page.wait_for_selector("#dt-length-0")
+    rows_before = await page.evaluate(ROWS_COUNT_JS)
     await page.select_option("#dt-length-0", value="-1")
-    await page.wait_for_timeout(3000)
 
-    rows = await page.query_selector_all("table.table-products tbody tr")
+    # Ждём, пока таблица покажет больше строк, чем на первой странице.
+    # Если строк не прибавилось (таблица уже была показана целиком) —
+    # забираем те, что есть
+    try:
+        await page.wait_for_function(
+            "(n) => document.querySelectorAll('table.table-products tbody tr').length > n",
+            arg=rows_before,
+            timeout=30000,
+        )
 
-    for row in rows:
-        cells = await row.query_selector_all("td")
+    except PlaywrightTimeoutError:
+        print(f"Количество строк не изменилось ({rows_before}), сохраняем имеющиеся")
 
-        data.append({
-            "app_id": await row.get_attribute("data-appid"),
-            "rank": await cells[0].inner_text(),
-            "name": await cells[2].inner_text(),
-            "current_players": await cells[3].inner_text(),
-            "24h_peak": await cells[4].inner_text(),
-            "all_time_peak": await cells[5].inner_text(),
-        })
+    data = await page.evaluate(CHARTS_EXTRACTOR_JS)
 
     return pd.DataFrame(data)
 
@@ -40,7 +61,6 @@ async def main():
     async with async_playwright() as p:
         browser = await p.chromium.launch(
             headless=False,
-            slow_mo=50,
         )
 
         context = await browser.new_context(
@@ -1,41 +1,264 @@
 import asyncio
-import lxml
 import random
 import re
 import csv
+import pandas as pd
 
-from bs4 import BeautifulSoup
+from dataclasses import dataclass, field
+from selectolax.lexbor import LexborHTMLParser, LexborNode
 from playwright.async_api import async_playwright
 from pathlib import Path
 
 
 
-async def fetch_html(page, app_id: int) -> str | None:
+_DATE_RE = re.compile(r"\d{1,2} \w+ \d{4} – \d{2}:\d{2}:\d{2} UTC")
+_TAG_EMOJI_RE = re.compile(r"([\W_]+)?\s*(.+)")
+_CURRENCY_PREFIX_RE = re.compile(r"^\S*-\s+")
+
+
+
+# Те же поля, что собирает SteamDBPageParser, но извлекаются в браузере
+EXTRACTOR_JS = r"""
+() => {
+    // Аналог Node.text(strip=True) из selectolax
+    const text = (node, separator = "") => {
+        const walker = document.createTreeWalker(node, NodeFilter.SHOW_TEXT);
+        const parts = [];
+
+        while (walker.nextNode()) {
+            const part = walker.currentNode.nodeValue.trim();
+            if (part) {
+                parts.push(part);
+            }
+        }
+
+        return parts.join(separator);
+    };
+
+    const children = (node, tag) => Array.from(node.children).filter(c => c.tagName === tag);
+
+    const result = {};
+
+    // Store info
+    const table = document.querySelector("div.span8 table");
+    if (table) {
+        Object.assign(result, {
+            app_id: null,
+            app_type: null,
+            developer: [],
+            publisher: [],
+            supported_systems: [],
+            release_date: null,
+        });
+
+        for (const row of table.querySelectorAll("tr")) {
+            const tds = row.querySelectorAll("td");
+            if (tds.length !== 2) {
+                continue;
+            }
+
+            const label = text(tds[0]);
+            const value = tds[1];
+
+            if (label === "App ID") {
+                const appId = text(value);
+                if (/^\d+$/.test(appId)) {
+                    result.app_id = Number(appId);
+                }
+            } else if (label === "App Type") {
+                result.app_type = text(value);
+            } else if (label === "Developer") {
+                result.developer = Array.from(value.querySelectorAll("a"), a => text(a));
+            } else if (label === "Publisher") {
+                result.publisher = Array.from(value.querySelectorAll("a"), a => text(a));
+            } else if (label === "Supported Systems") {
+                const systems = [];
+                if (value.querySelector(".octicon-windows")) systems.push("Windows");
+                if (value.querySelector(".octicon-linux")) systems.push("Linux");
+                if (value.querySelector(".octicon-apple")) systems.push("macOS");
+                result.supported_systems = systems;
+            } else if (label === "Release Date") {
+                const match = text(value, " ").match(/\d{1,2} \w+ \d{4} – \d{2}:\d{2}:\d{2} UTC/);
+                if (match) {
+                    result.release_date = match[0];
+                }
+            }
+        }
+    }
+
+    // Rating: значения отдаём строками, приводим к числам в Python
+    const rating = document.querySelector('a[itemprop="aggregateRating"]');
+    result.rating_percent = rating?.querySelector('meta[itemprop="ratingValue"]')?.content ?? null;
+    result.reviews_count = rating?.querySelector('meta[itemprop="reviewCount"]')?.content ?? null;
+
+    // Tags
+    const tagsBlock = document.querySelector("div.store-tags") || document.querySelector("div.header-app-tags");
+    result.tags = [];
+
+    if (tagsBlock) {
+        for (const a of tagsBlock.querySelectorAll("a[href^='/tag/']")) {
+            const tag = text(a);
+            const match = tag.match(/^([^\p{L}\p{N}]+)?\s*(.+)/u);
+            const name = match ? match[2].trim() : tag;
+
+            if (name) {
+                result.tags.push(name);
+            }
+        }
+    }
+
+    // Categories
+    const headers = Array.from(document.querySelectorAll("h2, h3"));
+    const namedCategories = [
+        ["Categories", "categories"],
+        ["Hardware", "hardware_categories"],
+        ["Accessibility", "accessibility_categories"],
+    ];
+
+    for (const [title, key] of namedCategories) {
+        const header = headers.find(h => h.textContent.includes(title));
+        let block = header?.nextElementSibling;
+
+        while (block && !block.matches("div.store-categories")) {
+            block = block.nextElementSibling;
+        }
+
+        const items = block ? Array.from(block.querySelectorAll("a.btn span"), span => text(span)) : [];
+        if (items.length) {
+            result[key] = items;
+        }
+    }
+
+    // Prices
+    const prices = document.querySelector("table.table-prices");
+    if (prices) {
+        const currencies = ["CIS - U.S. Dollar", "U.S. Dollar", "Euro"];
+        result.prices = {};
+
+        for (const row of prices.querySelectorAll("tbody tr")) {
+            const currencyTd = row.querySelector("td.price-line");
+            if (!currencyTd) {
+                continue;
+            }
+
+            const currencyName = text(currencyTd).replace(/^\S*-\s+/, "");
+
+            if (!currencies.includes(currencyName)) {
+                continue;
+            }
+
+            const tds = children(row, "TD");
+
+            result.prices[currencyName] = {
+                current_price: tds.length > 1 ? text(tds[1]) : null,
+                lowest_recorded_price: tds.length ? text(tds[tds.length - 1]) : null,
+            };
+        }
+    }
+
+    return result;
+}
+"""
+
+
+
+# Статика, не нужная для разбора страницы. Блокируется через CDP, а не
+# context.route: с маршрутом Playwright отключает HTTP-кэш контекста
+BLOCKED_URL_PATTERNS = [
+    pattern
+    for ext in ("png", "jpg", "jpeg", "gif", "webp", "avif", "ico", "css", "woff", "woff2", "ttf", "otf", "mp4", "webm")
+    for pattern in (f"*.{ext}", f"*.{ext}?*")
+]
+
+
+
+async def block_static(context, page):
+    session = await context.new_cdp_session(page)
+    await session.send("Network.enable")
+    await session.send("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+
+
+
+async def open_app_page(page, app_id: int) -> bool:
     url = f"https://steamdb.info/app/{app_id}/"
     
     try:
+        # domcontentloaded гарантирует, что теги, категории и цены ниже по странице уже разобраны
         await page.goto(url, wait_until="domcontentloaded", timeout=60000)
-        await page.wait_for_selector("td:has-text('App ID')", timeout=60000)
-        html = await page.content()
-        
-        return html
+        await page.wait_for_selector("div.span8 table", state="attached", timeout=30000)
+
+        return True
         
     except Exception as e:
         print(f"app_id={app_id}: {e}")
         
-        return None
+        return False
+
+
+
+async def fetch_html(page) -> str:
+    return await page.content()
+
+
+
+async def extract_data(page) -> dict:
+    data = await page.evaluate(EXTRACTOR_JS)
+
+    if data["rating_percent"] is not None:
+        data["rating_percent"] = float(data["rating_percent"])
+
+    if data["reviews_count"] is not None:
+        data["reviews_count"] = int(data["reviews_count"])
+
+    return data
+
+
+
+async def check_parity(page, parser) -> list[str]:
+    # EXTRACTOR_JS дублирует SteamDBPageParser, сверяем их на открытой странице
+    js_data = await extract_data(page)
+
+    py_data = parser.parse(await fetch_html(page))
+
+    return sorted(k for k in js_data.keys() | py_data.keys() if js_data.get(k) != py_data.get(k))
+
+
+
+class RateLimiter:
+    def __init__(self, delay_range: tuple[float, float], concurrency: int):
+        self.delay_range = delay_range
+        self.concurrency = concurrency
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Запросы выходят по одному с интервалом uniform(*delay_range) / concurrency:
+        # при (5, 10) и 8 воркерах это ~0.94 с, т.е. примерно в 8 раз чаще,
+        # чем последовательный обход с паузой 5-10 с после каждой страницы
+        async with self._lock:
+            await asyncio.sleep(random.uniform(*self.delay_range) / self.concurrency)
+
+
+
+@dataclass
+class PageContext:
+    # Узлы страницы, найденные один раз и общие для всех парсеров блоков
+    store_table: LexborNode | None = None
+    rating_block: LexborNode | None = None
+    tags_block: LexborNode | None = None
+    prices_table: LexborNode | None = None
+    headers: list[LexborNode] = field(default_factory=list)
 
 
 
 class SteamDBBlockParser:
-    def parse(self, soup: BeautifulSoup) -> dict:
+    def parse(self, ctx: PageContext) -> dict:
         raise NotImplementedError
 
 
 
 class StoreInfoParser(SteamDBBlockParser):
-    def parse(self, soup: BeautifulSoup) -> dict:
-        table = soup.select_one("div.span8 table")
+    def parse(self, ctx: PageContext) -> dict:
+        table = ctx.store_table
         if not table:
             return {}
 
@@ -48,47 +271,47 @@ class StoreInfoParser(SteamDBBlockParser):
             "release_date": None,
         }
 
-        for row in table.select("tr"):
-            tds = row.select("td")
+        for row in table.css("tr"):
+            tds = row.css("td")
             if len(tds) != 2:
                 continue
 
-            label = tds[0].get_text(strip=True)
+            label = tds[0].text(strip=True)
             value = tds[1]
 
             if label == "App ID":
                 try:
-                    data["app_id"] = int(value.get_text(strip=True))
+                    data["app_id"] = int(value.text(strip=True))
 
                 except ValueError:
                     pass
 
             elif label == "App Type":
-                data["app_type"] = value.get_text(strip=True)
+                data["app_type"] = value.text(strip=True)
 
             elif label == "Developer":
-                data["developer"] = [a.get_text(strip=True) for a in value.select("a")]
+                data["developer"] = [a.text(strip=True) for a in value.css("a")]
 
             elif label == "Publisher":
-                data["publisher"] = [a.get_text(strip=True) for a in value.select("a")]
+                data["publisher"] = [a.text(strip=True) for a in value.css("a")]
 
             elif label == "Supported Systems":
                 systems = []
                 
-                if value.select_one(".octicon-windows"):
+                if value.css_first(".octicon-windows"):
                     systems.append("Windows")
                     
-                if value.select_one(".octicon-linux"):
+                if value.css_first(".octicon-linux"):
                     systems.append("Linux")
                     
-                if value.select_one(".octicon-apple"):
+                if value.css_first(".octicon-apple"):
                     systems.append("macOS")
                     
                 data["supported_systems"] = systems
 
             elif label == "Release Date":
-                text = value.get_text(" ", strip=True)
-                match = re.search(r"\d{1,2} \w+ \d{4} – \d{2}:\d{2}:\d{2} UTC", text,)
+                text = value.text(separator=" ", strip=True)
+                match = _DATE_RE.search(text)
 
                 if match:
                     data["release_date"] = match.group(0)
@@ -98,48 +321,42 @@ class StoreInfoParser(SteamDBBlockParser):
 
 
 class RatingParser(SteamDBBlockParser):
-    def parse(self, soup: BeautifulSoup) -> dict:
+    def parse(self, ctx: PageContext) -> dict:
         data = {
             "rating_percent": None,
             "reviews_count": None,
         }
 
-        block = soup.select_one('a[itemprop="aggregateRating"]')
+        block = ctx.rating_block
         if not block:
             return data
 
-        rating = block.select_one('meta[itemprop="ratingValue"]')
-        reviews = block.select_one('meta[itemprop="reviewCount"]')
+        rating = block.css_first('meta[itemprop="ratingValue"]')
+        reviews = block.css_first('meta[itemprop="reviewCount"]')
 
         if rating:
-            data["rating_percent"] = float(rating["content"])
+            data["rating_percent"] = float(rating.attributes["content"])
 
         if reviews:
-            data["reviews_count"] = int(reviews["content"])
+            data["reviews_count"] = int(reviews.attributes["content"])
 
         return data
 
 
 
 class TagsParser(SteamDBBlockParser):
-    def parse(self, soup: BeautifulSoup) -> dict:
-        # Приоритет — полный список тегов
-        tags_block = soup.select_one("div.store-tags")
-
-        # Иначе - краткий список в шапке
-        if not tags_block:
-            tags_block = soup.select_one("div.header-app-tags")
-
+    def parse(self, ctx: PageContext) -> dict:
+        tags_block = ctx.tags_block
         if not tags_block:
             return {"tags": []}
 
         tags = []
 
-        for a in tags_block.select("a[href^='/tag/']"):
-            text = a.get_text(strip=True)
+        for a in tags_block.css("a[href^='/tag/']"):
+            text = a.text(strip=True)
 
             # Убираем emoji
-            match = re.match(r"([\W_]+)?\s*(.+)", text)
+            match = _TAG_EMOJI_RE.match(text)
             name = match.group(2).strip() if match else text
 
             if name:
@@ -157,51 +374,61 @@ class NamedCategoriesParser(SteamDBBlockParser):
         self.title = title
         self.result_key = result_key
 
-    def parse(self, soup: BeautifulSoup) -> dict:
-        header = soup.find(lambda tag: tag.name in ("h2", "h3") and self.title in tag.get_text())
+    def parse(self, ctx: PageContext) -> dict:
+        header = next((h for h in ctx.headers if self.title in h.text()), None)
         if not header:
             return {}
 
-        block = header.find_next_sibling("div", class_="store-categories")
+        block = self._find_categories_block(header)
         if not block:
             return {}
 
-        items = [span.get_text(strip=True) for span in block.select("a.btn span")]
+        items = [span.text(strip=True) for span in block.css("a.btn span")]
         
         return {self.result_key: items} if items else {}
 
+    @staticmethod
+    def _find_categories_block(header):
+        node = header.next
+
+        while node is not None:
+            if node.tag == "div" and "store-categories" in (node.attributes.get("class") or "").split():
+                return node
+
+            node = node.next
+
+        return None
+
 
 
 class PricesParser(SteamDBBlockParser):
     def __init__(self, currencies=None):
-        self.currencies = currencies or ["CIS - U.S. Dollar", "U.S. Dollar", "Euro"]
+        self.currencies = frozenset(currencies or ("CIS - U.S. Dollar", "U.S. Dollar", "Euro"))
 
-    def parse(self, soup: BeautifulSoup) -> dict:
+    def parse(self, ctx: PageContext) -> dict:
         prices_data = {}
         
-        table = soup.select_one("table.table-prices")
+        table = ctx.prices_table
         if not table:
             return prices_data
 
-        for row in table.select("tbody tr"):
-            currency_td = row.select_one("td.price-line")
+        for row in table.css("tbody tr"):
+            currency_td = row.css_first("td.price-line")
             if not currency_td:
                 continue
 
-            currency_name = currency_td.get_text(strip=True)
-            if " " in currency_name and currency_name.split()[0].endswith("-"):
-                currency_name = " ".join(currency_name.split()[1:])
+            currency_name = _CURRENCY_PREFIX_RE.sub("", currency_td.text(strip=True))
 
             if currency_name not in self.currencies:
                 continue
 
+            tds = [td for td in row.iter() if td.tag == "td"]
+
             # Current Price
-            current_price_td = row.select_one("td:nth-of-type(2)")
-            current_price = current_price_td.get_text(strip=True) if current_price_td else None
+            current_price = tds[1].text(strip=True) if len(tds) > 1 else None
 
             # Lowest Recorded Price
-            lowest_price_td = row.select("td")[-1] if row.select("td") else None
-            lowest_price = lowest_price_td.get_text(strip=True) if lowest_price_td else None
+            lowest_price = tds[-1].text(strip=True) if tds else None
 
             prices_data[currency_name] = {
                 "current_price": current_price,
@@ -225,39 +452,51 @@ class SteamDBPageParser:
         ]
 
     def parse(self, html: str) -> dict:
-        soup = BeautifulSoup(html, "lxml")
+        tree = LexborHTMLParser(html)
+
+        return self.parse_all(self.build_context(tree))
+
+    @staticmethod
+    def build_context(tree: LexborHTMLParser) -> PageContext:
+        return PageContext(
+            store_table=tree.css_first("div.span8 table"),
+            rating_block=tree.css_first('a[itemprop="aggregateRating"]'),
+            # Приоритет — полный список тегов, иначе - краткий список в шапке
+            tags_block=(
+                tree.css_first("div.store-tags")
+                or tree.css_first("div.header-app-tags")
+            ),
+            prices_table=tree.css_first("table.table-prices"),
+            headers=tree.css("h2, h3"),
+        )
 
+    def parse_all(self, ctx: PageContext) -> dict:
         result = {}
         for parser in self.parsers:
-            result.update(parser.parse(soup))
+            result.update(parser.parse(ctx))
 
         return result
 
 
 
 def load_app_ids(csv_path: str, start_from: int | None = None) -> list[int]:
-    app_ids = []
+    df = pd.read_csv(csv_path, usecols=lambda column: column == "app_id", dtype=str)
 
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+    # Без колонки app_id список пуст
+    raw_ids = df.get("app_id", pd.Series(dtype=str)).str.strip()
 
-        for row in reader:
-            try:
-                app_id = int(row["app_id"])
-                app_ids.append(app_id)
+    # Только целые id: "30.7" или "1e3" пропускаются, как и при int()
+    app_ids = raw_ids[raw_ids.str.fullmatch(r"[+-]?\d+", na=False)].astype(int).reset_index(drop=True)
 
-            except (KeyError, ValueError):
-                continue
+    if start_from is not None:
+        positions = (app_ids == start_from).to_numpy().nonzero()[0]
 
-    if start_from is None:
-        return app_ids
+        if not len(positions):
+            raise ValueError(f"start_from app_id={start_from} не найден в файле!")
 
-    if start_from not in app_ids:
-        raise ValueError(f"start_from app_id={start_from} не найден в файле!")
+        app_ids = app_ids.iloc[positions[0]:]
 
-    index = app_ids.index(start_from)
-
-    return app_ids[index:]
+    return app_ids.tolist()
 
 
 
@@ -266,8 +505,37 @@ def join_list(value):
 
 
 
+FIELDNAMES = (
+    "app_id",
+    "app_type",
+    "developer",
+    "publisher",
+    "supported_systems",
+    "release_date",
+    "rating_percent",
+    "reviews_count",
+    "tags",
+    "categories",
+    "hardware_categories",
+    "accessibility_categories",
+    "price_usd_current",
+    "price_usd_lowest",
+    "price_eur_current",
+    "price_eur_lowest",
+    "price_cis_current",
+    "price_cis_lowest",
+)
+
+
+
+# Общая заглушка для отсутствующих блоков, только для чтения
+_EMPTY = {}
+
+
+
 def flatten(data: dict) -> dict:
-    prices = data.get("prices", {})
+    prices = data.get("prices", _EMPTY)
+    usd, eur, cis = (prices.get(k, _EMPTY) for k in ("U.S. Dollar", "Euro", "CIS - U.S. Dollar"))
 
     return {
         # --- Store info ---
@@ -289,14 +557,14 @@ def flatten(data: dict) -> dict:
         "accessibility_categories": join_list(data.get("accessibility_categories")),
 
         # --- Prices ---
-        "price_usd_current": prices.get("U.S. Dollar", {}).get("current_price"),
-        "price_usd_lowest": prices.get("U.S. Dollar", {}).get("lowest_recorded_price"),
+        "price_usd_current": usd.get("current_price"),
+        "price_usd_lowest": usd.get("lowest_recorded_price"),
         
-        "price_eur_current": prices.get("Euro", {}).get("current_price"),
-        "price_eur_lowest": prices.get("Euro", {}).get("lowest_recorded_price"),
+        "price_eur_current": eur.get("current_price"),
+        "price_eur_lowest": eur.get("lowest_recorded_price"),
         
-        "price_cis_current": prices.get("CIS - U.S. Dollar", {}).get("current_price"),
-        "price_cis_lowest": prices.get("CIS - U.S. Dollar", {}).get("lowest_recorded_price"),
+        "price_cis_current": cis.get("current_price"),
+        "price_cis_lowest": cis.get("lowest_recorded_price"),
     }
 
 
@@ -332,8 +600,15 @@ async def main():
         await page.goto("https://steamdb.info/")
         await page.wait_for_timeout(5000)
 
-        # Короткая задержка между играми (ms)
-        SHORT_DELAY_RANGE = (5000, 10000)
+        # Сверка EXTRACTOR_JS с SteamDBPageParser на первой игре
+        if app_ids and await open_app_page(page, app_ids[0]):
+            mismatched = await check_parity(page, parser)
+
+            if mismatched:
+                print(f"EXTRACTOR_JS и SteamDBPageParser расходятся в полях: {', '.join(mismatched)}")
+
+        # Короткая задержка между играми (s)
+        SHORT_DELAY_RANGE = (5, 10)
 
         # Пауза каждые BLOCK_SIZE игр
         BLOCK_SIZE = 50
@@ -341,36 +616,102 @@ async def main():
         # Длительность паузы
         LONG_PAUSE = 10 * 60
 
-        with open(output_path, "a", newline="", encoding="utf-8") as f:
-            writer = None
-        
-            for i, app_id in enumerate(app_ids, start=1):
-                print(f"Парсинг: ID {app_id}")
-        
-                html = await fetch_html(page, app_id)
-                if not html:
-                    continue
-        
-                data = parser.parse(html)
-                row = flatten(data)
-        
-                if not row:
-                    continue
-        
-                if writer is None:
-                    writer = csv.DictWriter(f, fieldnames=row.keys())
-                    if not file_exists:
-                        writer.writeheader()
-                        file_exists = True
-        
-                writer.writerow(row)
-                f.flush()
-        
-                await page.wait_for_timeout(random.randint(*SHORT_DELAY_RANGE))
-        
-                if i % BLOCK_SIZE == 0:
-                    print(f"Долгая пауза в {LONG_PAUSE / 60} минут после {i} игр...")
-                    await asyncio.sleep(LONG_PAUSE)
+        # Количество одновременно открытых страниц
+        CONCURRENCY = 8
+
+        sem = asyncio.Semaphore(CONCURRENCY)
+        limiter = RateLimiter(SHORT_DELAY_RANGE, CONCURRENCY)
+        queue = asyncio.Queue()
+
+        # Сбрасывается на время долгой паузы
+        running = asyncio.Event()
+        running.set()
+
+        async def scrape(app_id: int) -> dict | None:
+            page = await context.new_page()
+
+            try:
+                await block_static(context, page)
+
+                if not await open_app_page(page, app_id):
+                    return None
+
+                try:
+                    data = await extract_data(page)
+
+                except Exception as e:
+                    print(f"app_id={app_id}: {e}")
+
+                    return None
+
+                return flatten(data)
+
+            finally:
+                await page.close()
+
+        async def worker(sem, position, app_id):
+            row = None
+
+            try:
+                async with sem:
+                    await running.wait()
+                    await limiter.acquire()
+                    print(f"Парсинг: ID {app_id}")
+
+                    row = await scrape(app_id)
+
+            except Exception as e:
+                print(f"app_id={app_id}: {e}")
+
+            finally:
+                # Неудачные попытки тоже отправляются — они учитываются для долгой паузы
+                await queue.put((position, row))
+
+        async def write_rows():
+            with open(output_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if not file_exists:
+                    writer.writerow(FIELDNAMES)
+
+                # Строки пишутся в порядке app_ids, чтобы при продолжении
+                # с последнего id в файле не пропустить незавершённые игры
+                pending = {}
+                next_position = 0
+
+                # Строки пишутся блоками перед долгой паузой
+                batch = []
+                finished = 0
+
+                try:
+                    while finished < len(app_ids):
+                        position, row = await queue.get()
+                        pending[position] = row
+                        finished += 1
+
+                        while next_position in pending:
+                            row = pending.pop(next_position)
+                            next_position += 1
+
+                            if row:
+                                batch.append([row[k] for k in FIELDNAMES])
+
+                        if finished % BLOCK_SIZE == 0:
+                            writer.writerows(batch)
+                            f.flush()
+                            batch.clear()
+
+                            print(f"Долгая пауза в {LONG_PAUSE / 60} минут после {finished} игр...")
+                            running.clear()
+                            await asyncio.sleep(LONG_PAUSE)
+                            running.set()
+
+                finally:
+                    writer.writerows(batch)
+
+        writer_task = asyncio.create_task(write_rows())
+
+        await asyncio.gather(*(worker(sem, position, app_id) for position, app_id in enumerate(app_ids)))
+        await writer_task
             
         await browser.close()
 